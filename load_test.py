@@ -0,0 +1,625 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+离线端到端压测脚本
+在独立子进程中启动模拟四个新闻列表页的HTTP服务和记录邮件的SMTP服务，
+让 NewsScraperECUST 指向它们跑完整的 run() 流程，输出吞吐量和延迟报告。
+不访问 *.ecust.edu.cn，也不连接真实邮件服务器。
+"""
+
+import argparse
+import collections
+import datetime
+import email.header
+import json
+import multiprocessing
+import os
+import random
+import re
+import socketserver
+import statistics
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from news_scraper import SOURCES, NewsScraperECUST, setup_logging
+
+# 各来源对应的列表页URL和站点根URL属性名
+URL_ATTRS = {
+    'news': ('base_url', 'news_url'),
+    'student': ('student_base_url', 'student_news_url'),
+    'jwc': ('jwc_base_url', 'jwc_news_url'),
+    'gschool': ('gschool_base_url', 'gschool_news_url')
+}
+
+# 预置场景，命令行参数会覆盖其中的同名设置
+SCENARIOS = {
+    'baseline': {
+        'recipients': 100,
+        'items': 20
+    },
+    'many-recipients': {
+        'recipients': 100000,
+        'items': 20
+    },
+    'slow-sources': {
+        'recipients': 1000,
+        'items': 20,
+        'latency': {'news': 2.0, 'jwc': 5.0}
+    },
+    'large-pages': {
+        'recipients': 1000,
+        'items': 500,
+        'padding_kb': 512
+    },
+    'flaky-sources': {
+        'recipients': 1000,
+        'items': 20,
+        'error_rate': 0.5
+    },
+    'slow-smtp': {
+        'recipients': 1000,
+        'items': 20,
+        'smtp_delay': 0.05
+    }
+}
+
+# 收件人订阅分类轮换使用，空列表表示订阅全部
+CATEGORY_PATTERNS = [[], ['news'], ['jwc', 'student'], ['gschool']]
+
+# 订阅分类对应的新闻来源名称，用于独立核对每个收件人应收到的条数
+CATEGORY_SOURCES = {
+    'news': '学校新闻网',
+    'student': '学生处',
+    'jwc': '教务处',
+    'gschool': '研究生院'
+}
+
+
+def render_news_page(items, today, padding_kb=0):
+    """生成学校新闻网列表页"""
+    rows = []
+    for i in range(items):
+        rows.append(
+            f'<li class="news"><span class="news_title">'
+            f'<a href="/{today:%Y/%m%d}/c16a{i}/page.htm" title="学校新闻 {i}">学校新闻 {i}</a></span>'
+            f'<span class="news_meta"><span class="meta_day">{today.day:02d}</span>'
+            f'<span class="meta_year">{today:%Y.%m}</span></span></li>'
+        )
+    body = f'<ul class="news_list list2">{"".join(rows)}</ul>'
+    return _wrap_page(body, padding_kb)
+
+
+def render_student_page(items, today, padding_kb=0):
+    """生成学生处列表页"""
+    rows = []
+    for i in range(items):
+        rows.append(
+            f'<li><span class="news_title">'
+            f'<a href="/{today:%Y/%m%d}/c1048a{i}/page.htm" title="学生处通知 {i}">学生处通知 {i}</a></span>'
+            f'<span class="news_meta">{today:%Y-%m-%d}</span></li>'
+        )
+    body = (
+        '<div class="col_news_con"><div class="col_news_list listcon"><div id="wp_news_w6">'
+        f'<ul class="news_list list2">{"".join(rows)}</ul>'
+        '</div></div></div>'
+    )
+    return _wrap_page(body, padding_kb)
+
+
+def render_jwc_page(items, today, padding_kb=0):
+    """生成教务处首页"""
+    rows = []
+    for i in range(items):
+        rows.append(
+            f'<tr><td class="pan7"><a href="/{today:%Y/%m%d}/c3938a{i}/page.htm" title="教务处通知 {i}">教务处通知 {i}</a>'
+            f'<table><tr><td>教务处通知 {i}</td><td>{today:%Y-%m-%d}</td></tr></table></td></tr>'
+        )
+    body = f'<table>{"".join(rows)}</table>'
+    return _wrap_page(body, padding_kb)
+
+
+def render_gschool_page(items, today, padding_kb=0):
+    """生成研究生院列表页"""
+    rows = []
+    for i in range(items):
+        rows.append(
+            f'<li><span class="news_title">'
+            f'<a href="/{today:%Y/%m%d}/c12753a{i}/page.htm" title="研究生院通知 {i}">研究生院通知 {i}</a></span>'
+            f'<span class="news_meta">{today:%Y-%m-%d}</span></li>'
+        )
+    body = f'<ul class="news_list list2">{"".join(rows)}</ul>'
+    return _wrap_page(body, padding_kb)
+
+
+def _wrap_page(body, padding_kb):
+    """补齐HTML骨架，padding_kb 用于模拟体积较大的真实页面"""
+    padding = f'<!-- {"x" * (padding_kb * 1024)} -->' if padding_kb else ''
+    return f'<html><head><meta charset="utf-8"></head><body>{padding}{body}</body></html>'
+
+
+RENDERERS = {
+    'news': render_news_page,
+    'student': render_student_page,
+    'jwc': render_jwc_page,
+    'gschool': render_gschool_page
+}
+
+
+class FixtureHTTPServer(ThreadingHTTPServer):
+    """按路径返回各来源模拟列表页的HTTP服务，可为每个来源设置延迟和错误率"""
+
+    daemon_threads = True
+
+    def __init__(self, pages, latency=None, error_rate=0.0, seed=0):
+        super().__init__(('127.0.0.1', 0), FixtureRequestHandler)
+        # pages: 路径 -> (来源键, 页面字节)
+        self.pages = pages
+        self.latency = latency or {}
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+
+class FixtureRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        page = server.pages.get(urlparse(self.path).path)
+        with server.lock:
+            server.requests += 1
+            failed = page is not None and server.random.random() < server.error_rate
+            if page is None or failed:
+                server.errors += 1
+
+        if page is None:
+            self.send_error(404)
+            return
+
+        source, content = page
+        time.sleep(server.latency.get(source, 0))
+        if failed:
+            self.send_error(500)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SMTPSinkServer(socketserver.ThreadingTCPServer):
+    """只记录收到的邮件的SMTP服务，不做投递，delay 用于模拟慢速邮件服务器
+
+    每封邮件在 records 中保存一条 (收件地址元组, 解码后的主题)。
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, delay=0.0):
+        super().__init__(('127.0.0.1', 0), SMTPSinkHandler)
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.messages = 0
+        self.recipients = 0
+        self.total_bytes = 0
+        self.records = []
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode('ascii') + b'\r\n')
+
+    def handle(self):
+        server = self.server
+        recipients = []
+        self.reply('220 localhost SMTP sink')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                break
+            verb = line.decode('ascii', 'replace').strip().split(' ', 1)[0].upper()
+
+            if verb == 'EHLO':
+                self.wfile.write(b'250-localhost\r\n250-AUTH PLAIN\r\n250 8BITMIME\r\n')
+            elif verb == 'AUTH':
+                self.reply('235 Authentication successful')
+            elif verb == 'RCPT':
+                match = re.search(rb'<([^>]*)>', line)
+                recipients.append(match.group(1).decode('utf-8', 'replace') if match else '')
+                self.reply('250 OK')
+            elif verb in ('HELO', 'MAIL', 'NOOP'):
+                self.reply('250 OK')
+            elif verb == 'RSET':
+                recipients = []
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                size = 0
+                headers = []
+                in_headers = True
+                for data_line in self.rfile:
+                    if data_line == b'.\r\n':
+                        break
+                    size += len(data_line)
+                    if in_headers:
+                        if data_line == b'\r\n':
+                            in_headers = False
+                        elif data_line[:1] in (b' ', b'\t') and headers:
+                            # 折叠的头部续行
+                            headers[-1] += data_line.rstrip(b'\r\n')
+                        else:
+                            headers.append(data_line.rstrip(b'\r\n'))
+                time.sleep(server.delay)
+                record = (tuple(recipients), _decode_subject(headers))
+                with server.lock:
+                    server.messages += 1
+                    server.recipients += len(recipients)
+                    server.total_bytes += size
+                    server.records.append(record)
+                recipients = []
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                break
+            else:
+                self.reply('502 Command not implemented')
+
+
+def _decode_subject(headers):
+    """从原始头部行中取出并解码 Subject"""
+    for header in headers:
+        name, _, value = header.partition(b':')
+        if name.strip().lower() == b'subject':
+            raw = value.decode('ascii', 'replace').strip()
+            return str(email.header.make_header(email.header.decode_header(raw)))
+    return ''
+
+
+class TimedSMTP:
+    """包装SMTP连接，记录每封邮件 send_message 的耗时"""
+
+    def __init__(self, server, latencies):
+        self._server = server
+        self._latencies = latencies
+
+    def send_message(self, msg):
+        start = time.perf_counter()
+        try:
+            return self._server.send_message(msg)
+        finally:
+            self._latencies.append(time.perf_counter() - start)
+
+    def __getattr__(self, name):
+        return getattr(self._server, name)
+
+
+def _start(server):
+    """在后台线程中启动服务"""
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def _percentiles(values):
+    """返回 (p50, p95, p99, max)，单位秒"""
+    if not values:
+        return (0.0, 0.0, 0.0, 0.0)
+    if len(values) == 1:
+        return (values[0],) * 4
+    cuts = statistics.quantiles(values, n=100, method='inclusive')
+    return (cuts[49], cuts[94], cuts[98], max(values))
+
+
+def _format_ms(values):
+    p50, p95, p99, worst = _percentiles(values)
+    return f"p50 {p50 * 1000:.2f}ms  p95 {p95 * 1000:.2f}ms  p99 {p99 * 1000:.2f}ms  max {worst * 1000:.2f}ms"
+
+
+def _peak_memory_mb():
+    """当前进程的峰值常驻内存，不含模拟服务子进程（Linux 下 ru_maxrss 单位为KB）"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def serve_stand_ins(settings, paths, conn):
+    """在独立进程中运行模拟网站和SMTP服务
+
+    与被测进程分开，模拟服务的页面和缓冲区不计入被测进程的峰值内存，
+    其Python代码也不会与抓取脚本争用GIL而拉高抓取和发送耗时。
+    paths 为 来源键 -> 列表页路径；先通过 conn 发回两个端口，收到停止信号后发回统计数据。
+    """
+    today = datetime.date.today()
+    pages = {}
+    for key, path in paths.items():
+        content = RENDERERS[key](settings['items'], today, settings.get('padding_kb', 0))
+        pages[path] = (key, content.encode('utf-8'))
+
+    http_server = _start(FixtureHTTPServer(
+        pages,
+        latency=settings.get('latency'),
+        error_rate=settings.get('error_rate', 0.0),
+        seed=settings.get('seed', 0)
+    ))
+    smtp_server = _start(SMTPSinkServer(delay=settings.get('smtp_delay', 0.0)))
+    conn.send((http_server.server_address[1], smtp_server.server_address[1]))
+
+    conn.recv()
+    for server in (http_server, smtp_server):
+        server.shutdown()
+        server.server_close()
+    conn.send({
+        'http': {'requests': http_server.requests, 'errors': http_server.errors},
+        'smtp': {
+            'messages': smtp_server.messages,
+            'recipients': smtp_server.recipients,
+            'bytes': smtp_server.total_bytes,
+            'records': smtp_server.records
+        }
+    })
+    conn.close()
+
+
+def verify_delivery(recipients, news_items, records, max_examples=5):
+    """按订阅分类核对SMTP服务收到的邮件
+
+    每个订阅分类下有新闻的收件人应恰好收到一封邮件，主题中的条数应等于其订阅分类的新闻条数；
+    没有匹配新闻的收件人不应收到邮件。
+    """
+    source_counts = collections.Counter(item['source'] for item in news_items)
+    expected = {}
+    for recipient in recipients:
+        categories = recipient['categories']
+        if categories:
+            count = sum(source_counts[CATEGORY_SOURCES[category]] for category in categories)
+        else:
+            count = sum(source_counts.values())
+        if count:
+            expected[recipient['email']] = count
+
+    problems = {'missing': [], 'unexpected': [], 'duplicate': [], 'wrong_count': []}
+    received = {}
+    for addresses, subject in records:
+        match = re.search(r'\((\d+)条\)', subject)
+        count = int(match.group(1)) if match else None
+        for address in addresses:
+            if address in received:
+                problems['duplicate'].append(address)
+            else:
+                received[address] = count
+
+    for address, count in expected.items():
+        if address not in received:
+            problems['missing'].append(address)
+        elif received[address] != count:
+            problems['wrong_count'].append(f"{address}: 期望 {count} 条，实际 {received[address]} 条")
+    for address in received:
+        if address not in expected:
+            problems['unexpected'].append(address)
+
+    result = {'expected': len(expected), 'received': len(received), 'ok': not any(problems.values())}
+    for kind, items in problems.items():
+        result[kind] = len(items)
+        result[f"{kind}_examples"] = items[:max_examples]
+    return result
+
+
+def run_scenario(settings, workdir):
+    """按场景设置启动本地服务并跑一次完整流程，返回报告字典"""
+    config_file = os.path.join(workdir, 'config.json')
+    emails_file = os.path.join(workdir, 'emails.json')
+    with open(config_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'smtp': {
+                'server': '127.0.0.1',
+                # 端口在模拟服务启动后再填入
+                'port': 0,
+                'ssl': False,
+                'username': 'loadtest',
+                'password': 'loadtest',
+                'sender_email': 'loadtest@localhost'
+            },
+            'days': 1
+        }, f)
+    recipients = [
+        {
+            'name': f"收件人{i}",
+            'email': f"user{i}@example.com",
+            'categories': CATEGORY_PATTERNS[i % len(CATEGORY_PATTERNS)]
+        }
+        for i in range(settings['recipients'])
+    ]
+    with open(emails_file, 'w', encoding='utf-8') as f:
+        json.dump(recipients, f, ensure_ascii=False)
+
+    log_listener = setup_logging({
+        'file': os.path.join(workdir, 'news_scraper.log'),
+        'console': settings.get('console_log', False)
+    })
+    scraper = NewsScraperECUST(config_file, emails_file)
+
+    # 以抓取器自己的列表页路径挂载模拟页面，网站路径变更时无需同步修改
+    paths = {key: urlparse(getattr(scraper, url_attr)).path for key, (_, url_attr) in URL_ATTRS.items()}
+
+    # 使用 spawn 而不是 fork，子进程不会继承本进程的日志监听线程等状态
+    context = multiprocessing.get_context('spawn')
+    conn, child_conn = context.Pipe()
+    process = context.Process(target=serve_stand_ins, args=(settings, paths, child_conn), daemon=True)
+    process.start()
+    child_conn.close()
+    try:
+        http_port, smtp_port = conn.recv()
+        scraper.config['smtp']['port'] = smtp_port
+        http_base = f"http://127.0.0.1:{http_port}"
+        for key, (base_attr, url_attr) in URL_ATTRS.items():
+            setattr(scraper, base_attr, http_base)
+            setattr(scraper, url_attr, http_base + paths[key])
+
+        fetch_stats = {}
+
+        def timed_fetcher(key, fetcher):
+            def fetch():
+                start = time.perf_counter()
+                news = fetcher()
+                fetch_stats[key] = {'items': len(news), 'seconds': time.perf_counter() - start}
+                return news
+            return fetch
+
+        for key, fetcher in list(scraper.fetchers.items()):
+            scraper.fetchers[key] = timed_fetcher(key, fetcher)
+
+        send_latencies = []
+        connect_smtp = scraper._connect_smtp
+        scraper._connect_smtp = lambda: TimedSMTP(connect_smtp(), send_latencies)
+
+        # run() 会把 news.json 写到当前目录
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            start = time.perf_counter()
+            # 代理不可用、所有来源都没有新闻或邮件发送失败时为 False
+            run_ok = scraper.run()
+            total_seconds = time.perf_counter() - start
+        finally:
+            os.chdir(cwd)
+            log_listener.stop()
+        peak_memory_mb = _peak_memory_mb()
+
+        conn.send('stop')
+        stand_in_stats = conn.recv()
+    finally:
+        conn.close()
+        process.join(timeout=10)
+        if process.is_alive():
+            process.terminate()
+
+    # run() 保存的 news.json 即实际参与发送的新闻；流程中途退出时不存在
+    news_file = os.path.join(workdir, 'news.json')
+    news_items = []
+    if os.path.exists(news_file):
+        with open(news_file, 'r', encoding='utf-8') as f:
+            news_items = json.load(f)
+
+    smtp_stats = stand_in_stats['smtp']
+    send_seconds = sum(send_latencies)
+    return {
+        'settings': settings,
+        'total_seconds': total_seconds,
+        'fetch': fetch_stats,
+        'http': stand_in_stats['http'],
+        'smtp': {
+            'sent': len(send_latencies),
+            'received': smtp_stats['messages'],
+            'recipients': smtp_stats['recipients'],
+            'bytes': smtp_stats['bytes'],
+            'send_seconds': send_seconds,
+            'throughput': smtp_stats['messages'] / total_seconds if total_seconds else 0.0,
+            'latency': dict(zip(('p50', 'p95', 'p99', 'max'), _percentiles(send_latencies)))
+        },
+        'run_ok': run_ok,
+        'delivery': verify_delivery(recipients, news_items, smtp_stats['records']),
+        'peak_memory_mb': peak_memory_mb,
+        'send_latencies': send_latencies
+    }
+
+
+def print_report(name, report):
+    """打印压测报告"""
+    settings = report['settings']
+    smtp = report['smtp']
+    print(f"场景: {name}")
+    print(f"  收件人 {settings['recipients']}，每页 {settings['items']} 条，"
+          f"页面填充 {settings.get('padding_kb', 0)}KB，错误率 {settings.get('error_rate', 0.0):.0%}，"
+          f"SMTP延迟 {settings.get('smtp_delay', 0.0) * 1000:.0f}ms")
+    print("抓取:")
+    for key in SOURCES:
+        stats = report['fetch'].get(key)
+        if stats:
+            print(f"  {key:<8} {stats['items']:>5} 条  {stats['seconds'] * 1000:>9.1f}ms")
+    print(f"  HTTP请求 {report['http']['requests']} 次，错误 {report['http']['errors']} 次")
+    print("发送:")
+    print(f"  发送 {smtp['sent']} 封，SMTP服务收到 {smtp['received']} 封 / {smtp['recipients']} 个收件人，"
+          f"共 {smtp['bytes'] / 1024 / 1024:.1f}MB")
+    print(f"  单封耗时 {_format_ms(report['send_latencies'])}")
+    print(f"  发送累计 {smtp['send_seconds']:.2f}s")
+    delivery = report['delivery']
+    print("校验:")
+    print(f"  run() 结果: {'成功' if report['run_ok'] else '失败（未获取到新闻或邮件发送失败）'}")
+    print(f"  应收 {delivery['expected']} 人，实收 {delivery['received']} 人，缺失 {delivery['missing']}，"
+          f"多余 {delivery['unexpected']}，重复 {delivery['duplicate']}，条数不符 {delivery['wrong_count']}"
+          f"{'' if delivery['ok'] else '  [不匹配]'}")
+    for kind in ('missing', 'unexpected', 'duplicate', 'wrong_count'):
+        for example in delivery[f"{kind}_examples"]:
+            print(f"    {kind}: {example}")
+    print("总计:")
+    print(f"  端到端耗时 {report['total_seconds']:.2f}s，吞吐 {smtp['throughput']:.1f} 封/s")
+    if report['peak_memory_mb'] is not None:
+        print(f"  峰值内存 {report['peak_memory_mb']:.1f}MB")
+
+
+def parse_latency(value):
+    """解析 --latency 参数，格式为 来源=秒，如 jwc=2.5"""
+    key, _, seconds = value.partition('=')
+    if key not in SOURCES:
+        raise argparse.ArgumentTypeError(f"未知来源 {key}，可选: {' '.join(SOURCES)}")
+    try:
+        return key, float(seconds)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"延迟必须是数字: {value}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='离线端到端压测：本地模拟新闻网站和SMTP服务器')
+    parser.add_argument('--scenario', choices=list(SCENARIOS), default='baseline', help='预置场景 (默认: baseline)')
+    parser.add_argument('--recipients', type=int, help='收件人数量')
+    parser.add_argument('--items', type=int, help='每个列表页的新闻条数')
+    parser.add_argument('--padding-kb', type=int, help='每个页面额外填充的KB数，模拟大页面')
+    parser.add_argument('--latency', type=parse_latency, action='append', metavar='SOURCE=SECONDS',
+                        help='指定来源的响应延迟，可重复，如 --latency jwc=2')
+    parser.add_argument('--error-rate', type=float, help='列表页返回500错误的概率 (0-1)')
+    parser.add_argument('--smtp-delay', type=float, help='SMTP服务每封邮件的处理延迟（秒）')
+    parser.add_argument('--seed', type=int, help='随机种子，用于复现错误注入')
+    parser.add_argument('--console-log', action='store_true', help='同时把抓取脚本的日志输出到控制台')
+    parser.add_argument('--report', help='把报告以JSON格式写入指定文件')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    settings = dict(SCENARIOS[args.scenario])
+    settings['latency'] = dict(settings.get('latency', {}))
+    for name in ('recipients', 'items', 'padding_kb', 'error_rate', 'smtp_delay', 'seed'):
+        value = getattr(args, name)
+        if value is not None:
+            settings[name] = value
+    settings['latency'].update(args.latency or [])
+    settings['console_log'] = args.console_log
+
+    # 确保访问 127.0.0.1 不经过环境变量中配置的代理
+    os.environ['NO_PROXY'] = '127.0.0.1,localhost'
+
+    with tempfile.TemporaryDirectory(prefix='ecustnews-loadtest-') as workdir:
+        report = run_scenario(settings, workdir)
+
+    print_report(args.scenario, report)
+    if args.report:
+        report = {k: v for k, v in report.items() if k != 'send_latencies'}
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump({'scenario': args.scenario, **report}, f, ensure_ascii=False, indent=4)
+        print(f"报告已写入 {args.report}")
+    return 0 if report['run_ok'] and report['delivery']['ok'] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
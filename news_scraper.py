@@ -5,25 +5,189 @@
 自动抓取今日通知并发送到指定邮箱
 """
 
-import requests
-from bs4 import BeautifulSoup
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+# requests、BeautifulSoup、smtplib 及 email 相关模块较重，只在所选模式需要时才导入，
+# 使健康检查、单一来源抓取等短任务启动更快、占用内存更少
+import argparse
+import copy
 import json
 import datetime
 import logging
+import logging.handlers
+import os
+import queue
 import re
+import sys
 
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('news_scraper.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# 新闻来源：键与收件人订阅分类一致，值用于日志输出
+SOURCES = {
+    'news': '学校新闻网站',
+    'student': '学生处网站',
+    'jwc': '教务处网站',
+    'gschool': '研究生院网站'
+}
+
+
+class SizeTimeRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """日志文件超过指定大小或跨过零点时轮转，备份按 .1 .2 ... 编号"""
+
+    def __init__(self, filename, max_bytes=0, backup_count=0, rotate_daily=False, encoding='utf-8'):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding=encoding)
+        self.rotate_daily = rotate_daily
+        # 与 TimedRotatingFileHandler 一致：已有日志文件时以其最后修改时间为基准，
+        # 这样由 cron 定时启动的短进程也能按天轮转
+        if os.path.exists(self.baseFilename):
+            base_time = os.stat(self.baseFilename).st_mtime
+        else:
+            base_time = datetime.datetime.now().timestamp()
+        self.rollover_at = self._compute_rollover(base_time)
+
+    def _compute_rollover(self, base_time):
+        """计算下一次按时间轮转的时间戳（下一个零点）"""
+        if not self.rotate_daily:
+            return None
+        next_day = datetime.datetime.fromtimestamp(base_time).date() + datetime.timedelta(days=1)
+        return datetime.datetime.combine(next_day, datetime.time()).timestamp()
+
+    def shouldRollover(self, record):
+        if self.rollover_at is not None and datetime.datetime.now().timestamp() >= self.rollover_at:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = self._compute_rollover(datetime.datetime.now().timestamp())
+
+
+class ExcTextQueueHandler(logging.handlers.QueueHandler):
+    """放入队列前只合并消息参数，异常堆栈单独保存在 exc_text 中
+
+    标准 QueueHandler.prepare 会把堆栈拼进消息并清空 exc_text，
+    监听线程中的 JsonFormatter 就无法再单独输出堆栈字段。
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            # 与标准实现一致，不把异常对象和 traceback 放入队列
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """将日志记录格式化为单行JSON，便于日志采集"""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        exc_text = record.exc_text
+        if record.exc_info and not exc_text:
+            exc_text = self.formatException(record.exc_info)
+        if exc_text:
+            entry['exc_info'] = exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def load_logging_config(config_file='config.json'):
+    """从配置文件中读取 logging 配置段，读取失败时使用默认配置"""
+    try:
+        with open(config_file, 'r', encoding='utf-8') as f:
+            return json.load(f).get('logging', {})
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+
+def _int_option(log_config, key, default, warnings):
+    """读取整数配置项，无法转换为整数时使用默认值并记下警告"""
+    value = log_config.get(key, default)
+    try:
+        if isinstance(value, bool):
+            raise TypeError
+        return int(value)
+    except (TypeError, ValueError):
+        warnings.append(f"日志配置 {key} 的值 {value!r} 不是整数，已改用 {default}")
+        return default
+
+
+def setup_logging(log_config=None):
+    """配置日志
+
+    业务线程只把日志记录放入队列，由后台监听线程统一写入文件和控制台，
+    避免发送邮件等热点循环在日志锁上等待磁盘I/O。
+    返回已启动的 QueueListener，程序结束前应调用其 stop() 以刷新剩余日志。
+    """
+    log_config = log_config or {}
+    # 监听线程启动后才有处理器，配置问题先记下，最后再输出警告
+    warnings = []
+
+    # 级别可以写成名称（如 "DEBUG"）或数值（如 10）
+    level = log_config.get('level', 'INFO')
+    if isinstance(level, str):
+        level = level.upper()
+        valid_level = isinstance(logging.getLevelName(level), int)
+    else:
+        valid_level = isinstance(level, int) and not isinstance(level, bool) and level >= 0
+    if not valid_level:
+        warnings.append(f"未知的日志级别 {log_config.get('level')}，已改用 INFO")
+        level = 'INFO'
+
+    if log_config.get('json', False):
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(LOG_FORMAT)
+
+    handlers = []
+    log_file = log_config.get('file', 'news_scraper.log')
+    if log_file:
+        max_bytes = _int_option(log_config, 'max_bytes', 10 * 1024 * 1024, warnings)
+        backup_count = _int_option(log_config, 'backup_count', 5, warnings)
+        rotate_daily = log_config.get('rotate_daily', False)
+        # backup_count 为0时标准库不会改名旧文件，轮转只会反复重新打开同一个文件
+        if backup_count <= 0 and (max_bytes > 0 or rotate_daily):
+            warnings.append("backup_count 为0，日志文件不会轮转")
+            max_bytes = 0
+            rotate_daily = False
+        file_handler = SizeTimeRotatingFileHandler(
+            log_file,
+            max_bytes=max_bytes,
+            backup_count=backup_count,
+            rotate_daily=rotate_daily
+        )
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+    if log_config.get('console', True):
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(formatter)
+        handlers.append(stream_handler)
+
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(ExcTextQueueHandler(log_queue))
+    root.setLevel(level)
+
+    listener.start()
+    for message in warnings:
+        logging.warning(message)
+    return listener
 
 class NewsScraperECUST:
     def __init__(self, config_file='config.json', emails_file='emails.json'):
@@ -49,6 +213,14 @@ class NewsScraperECUST:
         self.gschool_base_url = "https://gschool.ecust.edu.cn"
         self.gschool_news_url = "https://gschool.ecust.edu.cn/12753/list.htm"
         
+        # 各来源的抓取方法，键见 SOURCES
+        self.fetchers = {
+            'news': self.get_news_list,
+            'student': self.get_student_news_list,
+            'jwc': self.get_jwc_news_list,
+            'gschool': self.get_gschool_news_list
+        }
+        
         # 代理设置
         self.proxies = None
         if 'proxy' in self.config and self.config['proxy'].get('enabled', False):
@@ -91,16 +263,19 @@ class NewsScraperECUST:
             logging.error(f"邮箱文件 {self.emails_file} 不存在")
             return []
     
+    def _get_soup(self, url):
+        """请求页面并解析为 BeautifulSoup 对象"""
+        import requests
+        from bs4 import BeautifulSoup
+        
+        response = requests.get(url, headers=HEADERS, timeout=10, proxies=self.proxies)
+        response.encoding = 'utf-8'
+        return BeautifulSoup(response.text, 'html.parser')
+    
     def get_news_list(self):
         """获取学校新闻网站的新闻列表"""
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
         try:
-            response = requests.get(self.news_url, headers=headers, timeout=10, proxies=self.proxies)
-            response.encoding = 'utf-8'
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = self._get_soup(self.news_url)
             
             news_items = []
             # 查找新闻列表容器
@@ -173,14 +348,8 @@ class NewsScraperECUST:
             
     def get_student_news_list(self):
         """获取学生处网站的新闻列表"""
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
         try:
-            response = requests.get(self.student_news_url, headers=headers, timeout=10, proxies=self.proxies)
-            response.encoding = 'utf-8'
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = self._get_soup(self.student_news_url)
             
             news_items = []
             
@@ -291,13 +460,8 @@ class NewsScraperECUST:
             return []
     
     def get_jwc_news_list(self):
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
         try:
-            response = requests.get(self.jwc_news_url, headers=headers, timeout=10, proxies=self.proxies)
-            response.encoding = 'utf-8'
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = self._get_soup(self.jwc_news_url)
 
             news_items = []
             # 直接找所有 class="pan7" 的新闻单元格
@@ -346,14 +510,8 @@ class NewsScraperECUST:
             
     def get_gschool_news_list(self):
         """获取研究生院网站的新闻列表"""
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
         try:
-            response = requests.get(self.gschool_news_url, headers=headers, timeout=10, proxies=self.proxies)
-            response.encoding = 'utf-8'
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = self._get_soup(self.gschool_news_url)
             
             news_items = []
             
@@ -536,60 +694,168 @@ class NewsScraperECUST:
         
         return html_content
     
+    def _connect_smtp(self):
+        """连接并登录SMTP服务器"""
+        import smtplib
+        
+        smtp_config = self.config['smtp']
+        if smtp_config.get('ssl', True):
+            server = smtplib.SMTP_SSL(smtp_config['server'], smtp_config['port'])
+        else:
+            server = smtplib.SMTP(smtp_config['server'], smtp_config['port'])
+        server.login(smtp_config['username'], smtp_config['password'])
+        return server
+    
+    def build_message(self, email_info, news_items):
+        """根据收件人订阅的分类生成邮件，没有符合订阅分类的新闻时返回None"""
+        from email.mime.text import MIMEText
+        from email.mime.multipart import MIMEMultipart
+        from email.utils import formataddr
+        
+        # 获取用户订阅的分类
+        user_categories = email_info.get('categories', [])
+        
+        # 如果用户没有订阅任何分类，则发送所有新闻
+        if not user_categories:
+            filtered_news = news_items
+        else:
+            # 根据用户订阅的分类筛选新闻
+            filtered_news = self.filter_news_by_category(news_items, user_categories)
+        
+        # 如果没有符合用户订阅分类的新闻，则跳过该用户
+        if not filtered_news:
+            logging.info(f"跳过 {email_info['email']}，没有符合订阅分类的新闻")
+            return None
+        
+        # 为该用户生成邮件内容
+        user_content = self.generate_email_content(filtered_news)
+        
+        # 创建邮件
+        msg = MIMEMultipart('alternative')
+        msg['From'] = f"{self.config['smtp']['sender_email']}"
+        # 用 formataddr 只编码显示名，写入待发目录后重新解析时仍能取到收件地址
+        msg['To'] = formataddr((email_info['name'], email_info['email']))
+        msg['Subject'] = f"华东理工大学今日通知 ({len(filtered_news)}条)"
+        
+        # 添加HTML内容
+        html_part = MIMEText(user_content, 'html', 'utf-8')
+        msg.attach(html_part)
+        return msg
+    
     def send_email(self, content, news_count, news_items):
-        """发送邮件"""
+        """发送邮件，有收件人发送失败时返回False（没有符合订阅分类新闻而跳过的不算失败）"""
         if not self.config.get('smtp'):
             logging.error("SMTP配置不存在")
             return False
         
-        smtp_config = self.config['smtp']
-        
         try:
             # 连接SMTP服务器
-            server = smtplib.SMTP_SSL(smtp_config['server'], smtp_config['port'])
-            server.login(smtp_config['username'], smtp_config['password'])
+            server = self._connect_smtp()
             
             # 发送给每个收件人，根据其订阅的分类
             success_count = 0
+            failed_count = 0
             for email_info in self.emails:
                 try:
-                    # 获取用户订阅的分类
-                    user_categories = email_info.get('categories', [])
-                    
-                    # 如果用户没有订阅任何分类，则发送所有新闻
-                    if not user_categories:
-                        filtered_news = news_items
-                    else:
-                        # 根据用户订阅的分类筛选新闻
-                        filtered_news = self.filter_news_by_category(news_items, user_categories)
-                    
-                    # 如果没有符合用户订阅分类的新闻，则跳过该用户
-                    if not filtered_news:
-                        logging.info(f"跳过 {email_info['email']}，没有符合订阅分类的新闻")
+                    msg = self.build_message(email_info, news_items)
+                    if msg is None:
                         continue
                     
-                    # 为该用户生成邮件内容
-                    user_content = self.generate_email_content(filtered_news)
-                    
-                    # 创建邮件
-                    msg = MIMEMultipart('alternative')
-                    msg['From'] = f"{smtp_config['sender_email']}"
-                    msg['To'] = f"{email_info['name']} <{email_info['email']}>"
-                    msg['Subject'] = f"华东理工大学今日通知 ({len(filtered_news)}条)"
-                    
-                    # 添加HTML内容
-                    html_part = MIMEText(user_content, 'html', 'utf-8')
-                    msg.attach(html_part)
-                    
                     server.send_message(msg)
+                    user_categories = email_info.get('categories', [])
                     logging.info(f"邮件发送成功: {email_info['email']} (分类: {', '.join(user_categories) if user_categories else '全部'})")
                     success_count += 1
                 except Exception as e:
                     logging.error(f"发送邮件到 {email_info['email']} 失败: {e}")
+                    failed_count += 1
             
             server.quit()
             logging.info(f"邮件发送完成，成功 {success_count}/{len(self.emails)} 个")
-            return success_count > 0
+            return failed_count == 0
+            
+        except Exception as e:
+            logging.error(f"发送邮件失败: {e}")
+            return False
+    
+    def render_to_spool(self, news_items, spool_dir='spool'):
+        """将每个收件人的邮件写入待发目录（.eml 文件），不连接SMTP服务器
+
+        SMTP配置不存在或有收件人的邮件生成失败时返回False（没有符合订阅分类新闻而跳过的不算失败）
+        """
+        if not self.config.get('smtp'):
+            logging.error("SMTP配置不存在")
+            return False
+        
+        os.makedirs(spool_dir, exist_ok=True)
+        # 文件名前缀取微秒级生成时间加进程号，同一秒内多次生成也不会覆盖尚未发送的邮件，
+        # 同时保持按文件名排序即按生成先后发送
+        prefix = f"{datetime.datetime.now().strftime('%Y%m%d%H%M%S%f')}_{os.getpid()}"
+        
+        rendered_count = 0
+        failed_count = 0
+        for index, email_info in enumerate(self.emails):
+            try:
+                msg = self.build_message(email_info, news_items)
+                if msg is None:
+                    continue
+                
+                # 先写入 .tmp 文件再改名，同时运行的 deliver 只会看到写完整的 .eml 文件
+                filename = os.path.join(spool_dir, f"{prefix}_{index:06d}.eml")
+                tmp_filename = filename + '.tmp'
+                try:
+                    with open(tmp_filename, 'xb') as f:
+                        f.write(msg.as_bytes())
+                    os.replace(tmp_filename, filename)
+                except Exception:
+                    if os.path.exists(tmp_filename):
+                        os.remove(tmp_filename)
+                    raise
+                rendered_count += 1
+            except Exception as e:
+                logging.error(f"生成 {email_info.get('email')} 的邮件失败: {e}")
+                failed_count += 1
+        
+        logging.info(f"已生成 {rendered_count} 封邮件到 {spool_dir}")
+        return failed_count == 0
+    
+    def deliver_spool(self, spool_dir='spool'):
+        """发送待发目录中的邮件，发送成功的文件会被删除，失败的保留以便下次重试"""
+        import email
+        import email.policy
+        
+        if not self.config.get('smtp'):
+            logging.error("SMTP配置不存在")
+            return False
+        
+        try:
+            filenames = sorted(f for f in os.listdir(spool_dir) if f.endswith('.eml'))
+        except FileNotFoundError:
+            logging.error(f"待发目录 {spool_dir} 不存在")
+            return False
+        
+        if not filenames:
+            logging.info(f"待发目录 {spool_dir} 中没有邮件")
+            return True
+        
+        try:
+            server = self._connect_smtp()
+            
+            success_count = 0
+            for filename in filenames:
+                path = os.path.join(spool_dir, filename)
+                try:
+                    with open(path, 'rb') as f:
+                        msg = email.message_from_binary_file(f, policy=email.policy.default)
+                    server.send_message(msg)
+                    os.remove(path)
+                    logging.info(f"邮件发送成功: {msg['To']}")
+                    success_count += 1
+                except Exception as e:
+                    logging.error(f"发送待发邮件 {filename} 失败: {e}")
+            
+            server.quit()
+            logging.info(f"待发邮件发送完成，成功 {success_count}/{len(filenames)} 个")
+            return success_count == len(filenames)
             
         except Exception as e:
             logging.error(f"发送邮件失败: {e}")
@@ -599,7 +865,9 @@ class NewsScraperECUST:
         """检查代理是否可用"""
         if not self.proxies:
             return True
-            
+        
+        import requests
+        
         test_url = "https://www.baidu.com"
         try:
             logging.info("正在测试代理连接...")
@@ -613,6 +881,31 @@ class NewsScraperECUST:
         except Exception as e:
             logging.error(f"代理连接测试失败: {e}")
             return False
+    
+    def check(self):
+        """健康检查：检查配置文件、收件人列表和代理，不抓取新闻也不发送邮件"""
+        healthy = True
+        if not self.config:
+            logging.error(f"配置文件 {self.config_file} 为空或无法加载")
+            healthy = False
+        elif 'days' not in self.config:
+            logging.error("配置文件缺少 days 参数")
+            healthy = False
+        
+        if not self.config.get('smtp'):
+            logging.error("SMTP配置不存在")
+            healthy = False
+        
+        if self.emails:
+            logging.info(f"已加载 {len(self.emails)} 个收件人")
+        else:
+            logging.warning("没有配置收件人邮箱")
+        
+        if not self.check_proxy():
+            healthy = False
+        
+        logging.info("健康检查通过" if healthy else "健康检查未通过")
+        return healthy
         
     def save_news_to_json(self, news_items, filename='news.json'):
         """将新闻保存到JSON文件"""
@@ -633,52 +926,30 @@ class NewsScraperECUST:
             logging.error(f"保存新闻到JSON文件失败: {e}")
             return False
     
-    def run(self):
-        """运行主程序"""
-        logging.info("开始抓取华东理工大学新闻...")
-        
+    def fetch_news(self, sources=None):
+        """抓取指定来源的新闻列表，sources 为 SOURCES 中的键，为空时抓取全部来源"""
+        all_news_items = []
+        # 去掉重复指定的来源并保持顺序，避免同一来源被抓取两次、新闻重复
+        for key in dict.fromkeys(sources or SOURCES):
+            news = self.fetchers[key]()
+            if news:
+                logging.info(f"获取到{SOURCES[key]} {len(news)} 条新闻")
+                all_news_items.extend(news)
+            else:
+                logging.warning(f"未获取到{SOURCES[key]}的新闻")
+        return all_news_items
+    
+    def collect_news(self, sources=None, output='news.json'):
+        """抓取并筛选最近的新闻，保存到JSON文件；代理不可用或未获取到任何新闻时返回None"""
         # 如果启用了代理，先测试代理是否可用
         if self.proxies and not self.check_proxy():
             logging.error("代理不可用，程序退出")
-            return
-        
-        all_news_items = []
-        
-        # 获取学校新闻网站的新闻列表
-        school_news = self.get_news_list()
-        if school_news:
-            logging.info(f"获取到学校新闻网站 {len(school_news)} 条新闻")
-            all_news_items.extend(school_news)
-        else:
-            logging.warning("未获取到学校新闻网站的新闻")
-        
-        # 获取学生处网站的新闻列表
-        student_news = self.get_student_news_list()
-        if student_news:
-            logging.info(f"获取到学生处网站 {len(student_news)} 条新闻")
-            all_news_items.extend(student_news)
-        else:
-            logging.warning("未获取到学生处网站的新闻")
-        
-        # 获取教务处网站的新闻列表
-        jwc_news = self.get_jwc_news_list()
-        if jwc_news:
-            logging.info(f"获取到教务处网站 {len(jwc_news)} 条新闻")
-            all_news_items.extend(jwc_news)
-        else:
-            logging.warning("未获取到教务处网站的新闻")
-            
-        # 获取研究生院网站的新闻列表
-        gschool_news = self.get_gschool_news_list()
-        if gschool_news:
-            logging.info(f"获取到研究生院网站 {len(gschool_news)} 条新闻")
-            all_news_items.extend(gschool_news)
-        else:
-            logging.warning("未获取到研究生院网站的新闻")
+            return None
         
+        all_news_items = self.fetch_news(sources)
         if not all_news_items:
             logging.warning("未获取到任何新闻")
-            return
+            return None
         
         logging.info(f"总共获取到 {len(all_news_items)} 条新闻")
         
@@ -687,23 +958,94 @@ class NewsScraperECUST:
         logging.info(f"筛选出最近 {self.config['days']} 天内的新闻 {len(recent_news)} 条")
         
         # 保存新闻到JSON文件
-        self.save_news_to_json(recent_news)
+        self.save_news_to_json(recent_news, output)
+        return recent_news
+    
+    def run(self, sources=None):
+        """运行主程序，代理不可用、未获取到任何新闻或邮件发送失败时返回False"""
+        logging.info("开始抓取华东理工大学新闻...")
+        
+        recent_news = self.collect_news(sources)
+        if recent_news is None:
+            return False
         
         # 只有在有新通知时才发送邮件
         if recent_news and self.emails:
             # 直接传递新闻列表，在send_email中根据用户订阅分类进行筛选
-            self.send_email("", len(recent_news), recent_news)
+            sent = self.send_email("", len(recent_news), recent_news)
         elif not recent_news:
             logging.info("最近无新通知，不发送邮件")
+            sent = True
         else:
             logging.warning("没有配置收件人邮箱")
+            sent = True
         
         logging.info("程序执行完成")
+        return sent
+
+def parse_args(argv=None):
+    """解析命令行参数，不指定子命令时执行完整流程（抓取并发送邮件）"""
+    parser = argparse.ArgumentParser(description='华东理工大学新闻通知抓取脚本')
+    parser.add_argument('--config', default='config.json', help='配置文件路径 (默认: config.json)')
+    parser.add_argument('--emails', default='emails.json', help='收件人文件路径 (默认: emails.json)')
+    # 不带子命令时 args.command 为 None，按 run 处理
+    parser.set_defaults(sources=None)
+    
+    subparsers = parser.add_subparsers(dest='command', metavar='command')
+    sources_kwargs = {
+        'nargs': '+',
+        'choices': list(SOURCES),
+        'help': f"只抓取指定来源，可选: {' '.join(SOURCES)} (默认: 全部)"
+    }
+    
+    run_parser = subparsers.add_parser('run', help='抓取新闻并发送邮件（默认）')
+    run_parser.add_argument('--sources', **sources_kwargs)
+    
+    fetch_parser = subparsers.add_parser('fetch', help='只抓取新闻并保存到JSON文件，不发送邮件')
+    fetch_parser.add_argument('--sources', **sources_kwargs)
+    fetch_parser.add_argument('--output', default='news.json', help='输出文件 (默认: news.json)')
+    
+    render_parser = subparsers.add_parser('render', help='抓取新闻并将邮件写入待发目录，不发送（试运行）')
+    render_parser.add_argument('--sources', **sources_kwargs)
+    render_parser.add_argument('--spool-dir', default='spool', help='待发目录 (默认: spool)')
+    
+    deliver_parser = subparsers.add_parser('deliver', help='发送待发目录中的邮件，不抓取新闻')
+    deliver_parser.add_argument('--spool-dir', default='spool', help='待发目录 (默认: spool)')
+    
+    subparsers.add_parser('check', help='健康检查：检查配置、收件人和代理')
+    
+    return parser.parse_args(argv)
 
-def main():
-    """主函数"""
-    scraper = NewsScraperECUST()
-    scraper.run()
+def main(argv=None):
+    """主函数，返回进程退出码"""
+    args = parse_args(argv)
+    log_listener = setup_logging(load_logging_config(args.config))
+    try:
+        scraper = NewsScraperECUST(args.config, args.emails)
+        
+        if args.command == 'check':
+            return 0 if scraper.check() else 1
+        
+        if args.command == 'deliver':
+            return 0 if scraper.deliver_spool(args.spool_dir) else 1
+        
+        # 代理不可用或未获取到任何新闻时以退出码1结束，便于 cron 或容器发现失败
+        if args.command in (None, 'run'):
+            return 0 if scraper.run(args.sources) else 1
+        
+        if args.command == 'fetch':
+            return 0 if scraper.collect_news(args.sources, args.output) is not None else 1
+        
+        if args.command == 'render':
+            recent_news = scraper.collect_news(args.sources)
+            if recent_news is None:
+                return 1
+            if not recent_news:
+                logging.info("最近无新通知，不生成邮件")
+                return 0
+            return 0 if scraper.render_to_spool(recent_news, args.spool_dir) else 1
+    finally:
+        log_listener.stop()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())